@@ -1,76 +1,49 @@
-import json
+import atexit
+import os
 import re
-from collections import defaultdict
+import time
 from datetime import datetime
-from typing import List, Optional
+from functools import lru_cache
+from typing import List
 
 import pytz
 import requests
-from dateutil import parser
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
+from requests.adapters import HTTPAdapter
 
 COMMON_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 MEDAL_EMOJI = "🏅"
+_AEST = pytz.timezone("Australia/Sydney")
+_UTC = pytz.UTC
 
+CACHE_DIR = "cache"
+CACHE_TTL_SECONDS = 5 * 60
 
-# Pydantic models
-class CompetitorResult(BaseModel):
-    position: str = ""
-    mark: str = ""
-    medalType: str = ""
-    irm: str = ""
-    penalty: Optional[str] = None
+_RACE_SUFFIX_RE = re.compile(r" - Race \d+")
+_RACE_NUM_RE = re.compile(r"Race (\d+)")
+_PARTICLES = frozenset({"von", "van", "de", "du", "la", "le"})
 
+# Shared session so repeated fetches reuse the same TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = COMMON_USER_AGENT
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+atexit.register(_SESSION.close)
 
+
+# Pydantic models, trimmed to the fields format_schedule reads
 class Competitor(BaseModel):
-    code: str
     noc: str
     name: str
-    order: int
-    results: Optional[CompetitorResult] = None
-
-
-class ExtraData(BaseModel):
-    detailUrl: Optional[str] = None
 
 
 class EventUnit(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     disciplineName: str
     eventUnitName: str
-    id: str
-    disciplineCode: str
-    genderCode: str
-    eventCode: str
-    phaseCode: str
-    eventId: str
-    eventName: str
-    phaseId: str
-    phaseName: str
-    disciplineId: str
-    eventOrder: int
-    phaseType: str
-    eventUnitType: str
-    olympicDay: str
     startDate: datetime
-    endDate: datetime
-    hideStartDate: bool
-    hideEndDate: bool
-    startText: str
-    order: int
-    venue: str
-    venueDescription: str
-    location: str
-    locationDescription: str
-    status: str
-    statusDescription: str
     medalFlag: int
-    liveFlag: bool
-    scheduleItemType: str
-    unitNum: str
-    sessionCode: str
-    groupId: Optional[str] = None
     competitors: List[Competitor] = Field(default_factory=list)
-    extraData: ExtraData
 
     @model_validator(mode='before')
     @classmethod
@@ -92,17 +65,9 @@ class OlympicSchedule(BaseModel):
         base_url = "https://sph-s-api.olympics.com/summer/schedules/api/ENG/schedule/day/"
         url = f"{base_url}{date}"
 
-        headers = {"User-Agent": COMMON_USER_AGENT}
-
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            with open("response.json", "w") as f:
-                json.dump(response.json(), f)
-
-            schedule_data = response.json()
-            return cls(**schedule_data)
-        except requests.RequestException as e:
+            return fetch_cached_schedule(url, date, cls.model_validate_json)
+        except (requests.RequestException, ValidationError) as e:
             print(f"An error occurred while fetching data: {e}")
             return None
 
@@ -110,44 +75,28 @@ class OlympicSchedule(BaseModel):
         if not self.units:
             return "No schedule data available."
 
-        formatted_schedule = f"# 🇦🇺 Olympic Events\n\n## {today.strftime('%-d %B')}\n\n"
-
-        australian_events = [
-            event for event in self.units
-            if any(comp.noc == "AUS" for comp in event.competitors)
-        ]
-        grouped_events = group_events(australian_events)
+        parts = ["# 🇦🇺 Olympic Events\n\n## ", today.strftime('%-d %B'), "\n\n"]
 
-        for (discipline, event_name), events in grouped_events.items():
-            australian_competitors = [
-                comp for event in events for comp in event.competitors if comp.noc == "AUS"
-            ]
-            australian_events = [
-                event for event in events
-                if any(comp.noc == "AUS" for comp in event.competitors)
-            ]
+        grouped_events = group_australian_events(self.units)
 
-            if not australian_competitors:
-                continue
+        for (discipline, event_name), group in grouped_events.items():
+            events = group["events"]
+            australian_competitors = group["aus_comps"]
 
-            start_time_aest = convert_to_aest(str(events[0].startDate))
+            start_time_aest = convert_to_aest(events[0].startDate)
 
-            medal_event = any(event.medalFlag == 1 for event in events)
             event_title = f"{discipline}: {event_name}"
-            if medal_event:
+            if group["medal"]:
                 event_title = f"{MEDAL_EMOJI} {event_title}"
 
-            if len(australian_events) > 1:
-                end_time_aest = convert_to_aest(str(events[-1].startDate))
-                formatted_schedule += f"### {start_time_aest.strftime('%H:%M')} - {end_time_aest.strftime('%H:%M')} - {event_title}\n"
-                race_numbers = [
-                    re.search(r"Race (\d+)", event.eventUnitName).group(1)
-                    for event in events
-                    if re.search(r"Race (\d+)", event.eventUnitName)
-                ]
-                formatted_schedule += f"#### Races: {', '.join(race_numbers)}\n"
+            if len(events) > 1:
+                end_time_aest = convert_to_aest(events[-1].startDate)
+                parts.append(
+                    f"### {start_time_aest.strftime('%H:%M')} - {end_time_aest.strftime('%H:%M')} - {event_title}\n"
+                    f"#### Races: {', '.join(group['race_numbers'])}\n"
+                )
             else:
-                formatted_schedule += f"### {start_time_aest.strftime('%H:%M')} - {event_title}\n"
+                parts.append(f"### {start_time_aest.strftime('%H:%M')} - {event_title}\n")
 
             if len(australian_competitors) == 1 and len(events[0].competitors) == 2:
                 aus_comp = australian_competitors[0]
@@ -156,61 +105,145 @@ class OlympicSchedule(BaseModel):
                 opp_name = format_name(opponent.name)
                 opp_country = opponent.noc
                 if aus_name == "Australia":
-                    formatted_schedule += f"* AUS vs {opp_country}\n"
+                    parts.append(f"* AUS vs {opp_country}\n")
                 else:
-                    formatted_schedule += f"* {aus_name} (AUS) vs {opp_name} ({opp_country})\n"
+                    parts.append(f"* {aus_name} (AUS) vs {opp_name} ({opp_country})\n")
             else:
-                for competitor in sorted(set(comp.name for comp in australian_competitors)):
-                    formatted_schedule += f"* {format_name(competitor)}\n"
+                unique_names = sorted({comp.name for comp in australian_competitors})
+                parts.extend(f"* {format_name(name)}\n" for name in unique_names)
 
-            formatted_schedule += "\n"
+            parts.append("\n")
 
-        return formatted_schedule
+        return "".join(parts)
 
 
-def convert_to_aest(time_str):
-    dt = parser.parse(time_str)
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=pytz.UTC)
-    aest = pytz.timezone("Australia/Sydney")
-    return dt.astimezone(aest)
+def fetch_cached_schedule(url, date, parse):
+    cache_path = os.path.join(CACHE_DIR, f"{date}.json")
+    etag_path = os.path.join(CACHE_DIR, f"{date}.etag")
 
+    try:
+        cache_age = time.time() - os.path.getmtime(cache_path)
+    except OSError:
+        cache_age = None
+
+    # A cached body that no longer parses is discarded and fetched again
+    if cache_age is not None and cache_age < CACHE_TTL_SECONDS:
+        try:
+            return parse(_read_bytes(cache_path))
+        except ValidationError:
+            _discard_cache(cache_path, etag_path)
+            cache_age = None
+
+    headers = {}
+    if cache_age is not None and os.path.exists(etag_path):
+        with open(etag_path) as f:
+            headers["If-None-Match"] = f.read().strip()
+
+    response = _SESSION.get(url, headers=headers, timeout=10)
+    if response.status_code == 304:
+        try:
+            schedule = parse(_read_bytes(cache_path))
+        except ValidationError:
+            _discard_cache(cache_path, etag_path)
+            response = _SESSION.get(url, timeout=10)
+        else:
+            os.utime(cache_path)
+            return schedule
+    response.raise_for_status()
+
+    raw = response.content
+    if os.getenv("OLYSCHED_DEBUG"):
+        with open("response.json", "wb") as f:
+            f.write(raw)
+
+    # Only cache a body that parsed, so a bad response cannot stick around
+    schedule = parse(raw)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _discard_cache(etag_path)
+    _write_atomic(cache_path, raw)
+    etag = response.headers.get("ETag")
+    if etag:
+        _write_atomic(etag_path, etag.encode())
+    return schedule
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _discard_cache(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def convert_to_aest(dt):
+    if isinstance(dt, str):
+        dt = datetime.fromisoformat(dt)
+    return dt.astimezone(_AEST) if dt.tzinfo else _UTC.localize(dt).astimezone(_AEST)
 
-def format_name(name):
-    def capitalize_name(n):
-        parts = n.split()
-        formatted_parts = []
-        for part in parts:
-            if part.lower() in ["von", "van", "de", "du", "la", "le"]:
-                formatted_parts.append(part.lower())
-            elif "-" in part:
-                formatted_parts.append(
-                    "-".join(word.capitalize() for word in part.split("-"))
-                )
-            else:
-                formatted_parts.append(part.capitalize())
-        return " ".join(formatted_parts)
 
+def _capitalize_name(n):
+    parts = n.split()
+    formatted_parts = []
+    for part in parts:
+        if part.lower() in _PARTICLES:
+            formatted_parts.append(part.lower())
+        elif "-" in part:
+            formatted_parts.append(
+                "-".join(word.capitalize() for word in part.split("-"))
+            )
+        else:
+            formatted_parts.append(part.capitalize())
+    return " ".join(formatted_parts)
+
+
+@lru_cache(maxsize=512)
+def format_name(name):
     if "/" in name:
-        names = name.split("/")
-        return " / ".join(capitalize_name(n.strip()) for n in names)
-    else:
-        return capitalize_name(name)
+        return " / ".join(_capitalize_name(n.strip()) for n in name.split("/"))
+    return _capitalize_name(name)
 
 
-def group_events(events):
-    grouped_events = defaultdict(list)
+def group_australian_events(events):
+    grouped_events = {}
     for event in events:
+        aus_comps = [comp for comp in event.competitors if comp.noc == "AUS"]
+        if not aus_comps:
+            continue
+
         key = (
             event.disciplineName,
-            re.sub(r" - Race \d+", "", event.eventUnitName),
+            _RACE_SUFFIX_RE.sub("", event.eventUnitName),
         )
-        grouped_events[key].append(event)
+        group = grouped_events.get(key)
+        if group is None:
+            group = grouped_events[key] = {
+                "events": [],
+                "aus_comps": [],
+                "medal": False,
+                "race_numbers": [],
+            }
+        group["events"].append(event)
+        group["aus_comps"].extend(aus_comps)
+        group["medal"] |= event.medalFlag == 1
+        if race := _RACE_NUM_RE.search(event.eventUnitName):
+            group["race_numbers"].append(race.group(1))
     return grouped_events
 
 
 def main():
-    today = datetime.now(pytz.timezone("Australia/Sydney")).date()
+    today = datetime.now(_AEST).date()
     schedule = OlympicSchedule.fetch_olympic_schedule(today.isoformat())
 
     if schedule: